@@ -1,25 +1,54 @@
 import os
+import re
+import json
+import queue
+import time
 import logging  # Added for secure exception handling
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 import requests
-from typing import List, Dict, Optional, Any
+from typing import Iterator, List, Dict, Optional, Any
 from fastapi import FastAPI, Request, Depends, HTTPException, Security
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
 from pydantic import BaseModel
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_groq import ChatGroq
 import uvicorn
 import asyncio
 from fastapi.security import APIKeyHeader
-# Configure logging
+# Configure logging: records are formatted and enqueued on the calling thread,
+# and a background listener does the blocking console write so async handlers
+# never stall the event loop on stdio
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter that renders the asctime date part once per second instead of once per record"""
+    
+    _cached = (None, "")  # ((epoch second, datefmt), formatted time); swapped as one tuple so threads never see a torn pair
+    
+    def formatTime(self, record, datefmt=None):
+        key = (int(record.created), datefmt)
+        cached = self._cached
+        if cached[0] != key:
+            cached = (key, time.strftime(datefmt or self.default_time_format, self.converter(key[0])))
+            self._cached = cached
+        if datefmt:
+            return cached[1]
+        return self.default_msec_format % (cached[1], record.msecs)
+
+log_queue = queue.Queue(-1)
+queue_handler = QueueHandler(log_queue)
+queue_handler.setFormatter(CachedTimeFormatter('%(asctime)s - %(levelname)s - %(message)s'))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()  # Logs to console
-        # Optionally add logging.FileHandler('app.log') for file logging
-    ]
+    handlers=[queue_handler]
 )
+log_listener = QueueListener(
+    log_queue,
+    logging.StreamHandler()  # Logs to console
+    # Optionally add logging.FileHandler('app.log') for file logging
+)
+log_listener.start()
 logger = logging.getLogger(__name__)
 
 # Load environment variables
@@ -64,7 +93,7 @@ try:
     )
     logger.info("✅ Groq LLM initialized successfully")
 except Exception as e:
-    logger.error(f"❌ Error initializing Groq: {str(e)}", exc_info=True)
+    logger.error("❌ Error initializing Groq: %s", e, exc_info=True)
     raise
 
 # Try to import the enhanced AI system
@@ -82,7 +111,7 @@ try:
     use_ai_system = True
     
 except Exception as e:
-    logger.error(f"⚠️ Error loading Enhanced AI system: {str(e)}", exc_info=True)
+    logger.error("⚠️ Error loading Enhanced AI system: %s", e, exc_info=True)
     logger.info("📦 Falling back to legacy system...")
     use_ai_system = False
 
@@ -90,88 +119,104 @@ except Exception as e:
 class LegacyWixAPIClient:
     def __init__(self, base_url: str):
         self.base_url = base_url if base_url else "https://your-wix-site.com"
-        logger.info(f"🔗 Legacy Wix Base URL: {self.base_url}")
+        logger.info("🔗 Legacy Wix Base URL: %s", self.base_url)
     
     def test_connection(self) -> bool:
         """Test if Wix API is reachable"""
         try:
             url = f"{self.base_url}/_functions/getNewArrivals"
-            logger.info(f"🔍 Testing connection to: {url}")
+            logger.info("🔍 Testing connection to: %s", url)
             response = requests.get(url, timeout=10)
-            logger.info(f"📡 Response status: {response.status_code}")
+            logger.info("📡 Response status: %s", response.status_code)
             return response.status_code == 200
         except Exception as e:
-            logger.error(f"❌ Connection test failed: {str(e)}", exc_info=True)
+            logger.error("❌ Connection test failed: %s", e, exc_info=True)
             return False
     
     def get_new_arrivals(self, limit: int = 15) -> List[Dict]:
         """Get new arrivals from Wix"""
         try:
             url = f"{self.base_url}/_functions/getNewArrivals?limit={limit}"
-            logger.info(f"🛍️ Fetching new arrivals from: {url}")
+            logger.info("🛍️ Fetching new arrivals from: %s", url)
             
             response = requests.get(url, timeout=15)
-            logger.info(f"📡 New arrivals response status: {response.status_code}")
+            logger.info("📡 New arrivals response status: %s", response.status_code)
             
             if response.status_code == 200:
                 products = response.json()
-                logger.info(f"✅ Found {len(products)} new arrivals")
+                logger.info("✅ Found %s new arrivals", len(products))
                 return products
             else:
-                logger.error(f"❌ Error response: {response.text}")
+                logger.error("❌ Error response: %s", response.text)
                 return []
         except Exception as e:
-            logger.error(f"❌ Error fetching new arrivals: {str(e)}", exc_info=True)
+            logger.error("❌ Error fetching new arrivals: %s", e, exc_info=True)
             return []
 
 # Initialize legacy client as fallback
 if not use_ai_system:
     legacy_wix_client = LegacyWixAPIClient(WIX_BASE_URL)
 
+# Very basic new arrivals detection: all trigger phrases compiled into one
+# case-insensitive alternation so a message is scanned in a single pass
+NEW_ARRIVALS_PATTERN = re.compile(
+    "|".join(re.escape(phrase) for phrase in [
+        "new arrivals", "new arrival", "what's new", "whats new", 
+        "latest", "recent", "newest", "show me new", "new items",
+        "new products", "fresh", "just added", "arrivals"
+    ]),
+    re.IGNORECASE
+)
+
 # Legacy fallback function
 def legacy_process_message(message: str) -> str:
     """Legacy message processing with basic pattern matching"""
-    message_lower = message.lower()
-    logger.info(f"🤔 Legacy processing message: '{message}'")
+    return "".join(stream_legacy_message(message))
+
+def stream_legacy_message(message: str) -> Iterator[str]:
+    """Legacy reply yielded block by block (blocking; run it off the event loop in async code)"""
+    logger.info("🤔 Legacy processing message: '%s'", message)
     
-    # Very basic new arrivals detection
-    if any(phrase in message_lower for phrase in [
-        "new arrivals", "new arrival", "what's new", "whats new", 
-        "latest", "recent", "newest", "show me new", "new items",
-        "new products", "fresh", "just added", "arrivals"
-    ]):
+    if NEW_ARRIVALS_PATTERN.search(message):
         logger.info("🆕 Detected new arrivals request")
         try:
             products = legacy_wix_client.get_new_arrivals(8)
-            if not products:
-                return "I'm sorry, I couldn't retrieve the new arrivals right now. Please try again later or check our website directly."
-            
-            result = "🆕 **Here are our latest new arrivals:**\n\n"
-            
-            for i, product in enumerate(products[:6], 1):
-                result += f"{i}. **{product.get('name', 'Product')}**\n"
-                
-                if product.get('formattedDiscountedPrice') and product.get('formattedDiscountedPrice') != product.get('formattedPrice'):
-                    result += f"   💰 **{product['formattedDiscountedPrice']}** ~~{product.get('formattedPrice', 'N/A')}~~\n"
-                else:
-                    result += f"   💰 {product.get('formattedPrice', 'Price not available')}\n"
-                
-                result += f"   📦 {'✅ In Stock' if product.get('inStock', False) else '❌ Out of Stock'}\n"
-                
-                if product.get('slug'):
-                    result += f"   🔗 [View Product]({legacy_wix_client.base_url}/product/{product['slug']})\n\n"
-                else:
-                    result += "\n"
+        except Exception as e:
+            logger.error("❌ Error in legacy new arrivals: %s", e, exc_info=True)
+            yield "I encountered an error while fetching new arrivals. Please try again or contact support."
+            return
+        
+        if not products:
+            yield "I'm sorry, I couldn't retrieve the new arrivals right now. Please try again later or check our website directly."
+            return
+        
+        yield "🆕 **Here are our latest new arrivals:**\n\n"
+        
+        shown = products[:6]
+        # Everything in the link before the slug is the same for every product
+        link_prefix = f"   🔗 [View Product]({legacy_wix_client.base_url}/product/"
+        
+        for i, product in enumerate(shown, 1):
+            if product.get('formattedDiscountedPrice') and product.get('formattedDiscountedPrice') != product.get('formattedPrice'):
+                price = f"**{product['formattedDiscountedPrice']}** ~~{product.get('formattedPrice', 'N/A')}~~"
+            else:
+                price = product.get('formattedPrice', 'Price not available')
             
-            result += f"\n💡 *Showing {len(products[:6])} of {len(products)} new arrivals. Visit our website to see more!*"
-            return result
+            slug = product.get('slug')
+            link = f"{link_prefix}{slug})\n" if slug else ""
             
-        except Exception as e:
-            logger.error(f"❌ Error in legacy new arrivals: {str(e)}", exc_info=True)
-            return "I encountered an error while fetching new arrivals. Please try again or contact support."
+            # One string per product block instead of one concatenation per line
+            yield (
+                f"{i}. **{product.get('name', 'Product')}**\n"
+                f"   💰 {price}\n"
+                f"   📦 {'✅ In Stock' if product.get('inStock', False) else '❌ Out of Stock'}\n"
+                f"{link}\n"
+            )
+        
+        yield f"\n💡 *Showing {len(shown)} of {len(products)} new arrivals. Visit our website to see more!*"
     
     else:
-        return "👋 Hello! I'm here to help you discover our latest new arrivals and assist with order management. Just ask me 'show me new arrivals' or 'check my orders' to get started!"
+        yield "👋 Hello! I'm here to help you discover our latest new arrivals and assist with order management. Just ask me 'show me new arrivals' or 'check my orders' to get started!"
 
 # ============================================================================
 # API ENDPOINTS - ENHANCED FOR ADVANCED ORDER MANAGEMENT
@@ -179,6 +224,18 @@ def legacy_process_message(message: str) -> str:
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Upper bound for any single diagnostic probe, so a stalled Wix backend
+# can't hang /health or /test-wix
+DIAGNOSTIC_TIMEOUT = 5
+
+async def bounded_probe(probe, default: Any, timeout: float = DIAGNOSTIC_TIMEOUT) -> Any:
+    """Await a diagnostic probe, returning default if it doesn't finish in time"""
+    try:
+        return await asyncio.wait_for(probe, timeout)
+    except asyncio.TimeoutError:
+        logger.warning("⏱️ Diagnostic probe timed out after %ss", timeout)
+        return default
+
 # Validate API key
 async def verify_api_key(api_key: str = Security(api_key_header)):
     expected_api_key = os.getenv("CONFIG_API_KEY")  # Load from .env
@@ -186,6 +243,14 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
         raise HTTPException(status_code=403, detail="Invalid API key")
     return api_key
 
+@app.on_event("shutdown")
+async def shutdown():
+    # Release pooled Wix connections
+    if use_ai_system:
+        await wix_client.close()
+    # Flush queued log records before the process exits
+    log_listener.stop()
+
 @app.get("/config")
 async def get_config(api_key: str = Depends(verify_api_key)):
     return {
@@ -196,8 +261,8 @@ async def get_config(api_key: str = Depends(verify_api_key)):
 @app.post("/chat", response_model=ChatResponse)
 async def chat(message: ChatMessage):
     try:
-        logger.info(f"💬 Received message: {message.message}")
-        logger.info(f"👤 User ID: {message.user_id}")
+        logger.info("💬 Received message: %s", message.message)
+        logger.info("👤 User ID: %s", message.user_id)
         
         if use_ai_system:
             result = await agent.process_message(
@@ -218,12 +283,39 @@ async def chat(message: ChatMessage):
             return ChatResponse(response=response_text, confidence=0.9)
     
     except Exception as e:
-        logger.error(f"❌ Error in chat: {str(e)}", exc_info=True)
+        logger.error("❌ Error in chat: %s", e, exc_info=True)
         return ChatResponse(
             response="I apologize for the technical difficulty. Please try again or contact our customer service team.",
             confidence=0.1
         )
 
+@app.post("/chat/stream")
+async def chat_stream(message: ChatMessage):
+    """Stream the reply as newline-delimited JSON events (an early render event when data was fetched, token events, then a final done event)"""
+    logger.info("💬 Received streaming message: %s", message.message)
+    logger.info("👤 User ID: %s", message.user_id)
+    
+    async def events():
+        try:
+            if use_ai_system:
+                async for event in agent.process_message_stream(message.message, user_id=message.user_id):
+                    yield json.dumps(event) + "\n"
+            else:
+                # The legacy client blocks on requests.get, so drive the generator in a worker thread
+                async for chunk in iterate_in_threadpool(stream_legacy_message(message.message)):
+                    yield json.dumps({"type": "token", "content": chunk}) + "\n"
+                yield json.dumps({"type": "done", "confidence": 0.9, "render": [], "success": True}) + "\n"
+        except Exception as e:
+            logger.error("❌ Error in chat stream: %s", e, exc_info=True)
+            yield json.dumps({
+                "type": "done",
+                "error": "I apologize for the technical difficulty. Please try again or contact our customer service team.",
+                "confidence": 0.1,
+                "success": False
+            }) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.get("/")
 async def root():
     system_status = "enhanced_ai" if use_ai_system else "legacy_fallback"
@@ -266,7 +358,7 @@ async def health_check():
     """Enhanced health check endpoint"""
     if use_ai_system:
         try:
-            wix_connected = await wix_client.test_connection()
+            wix_connected = await bounded_probe(wix_client.test_connection(), False)
             agent_healthy = agent.is_healthy()
             
             return {
@@ -300,7 +392,7 @@ async def health_check():
                 "no_patterns": True
             }
         except Exception as e:
-            logger.error(f"❌ Error in health check: {str(e)}", exc_info=True)
+            logger.error("❌ Error in health check: %s", e, exc_info=True)
             return {
                 "status": "degraded",
                 "system": "enhanced_ai",
@@ -321,7 +413,7 @@ async def health_check():
                 "note": "Using basic pattern matching as fallback"
             }
         except Exception as e:
-            logger.error(f"❌ Error in legacy health check: {str(e)}", exc_info=True)
+            logger.error("❌ Error in legacy health check: %s", e, exc_info=True)
             return {
                 "status": "error",
                 "system": "legacy_fallback", 
@@ -366,7 +458,7 @@ async def test_ai():
                     "response_preview": result.get("response", "")[:100] + "..." if len(result.get("response", "")) > 100 else result.get("response", "")
                 })
             except Exception as e:
-                logger.error(f"❌ Error testing message '{msg}': {str(e)}", exc_info=True)
+                logger.error("❌ Error testing message '%s': %s", msg, e, exc_info=True)
                 test_results.append({
                     "message": msg,
                     "error": "An error occurred during processing",
@@ -392,7 +484,7 @@ async def test_ai():
         }
         
     except Exception as e:
-        logger.error(f"❌ Error in test-ai: {str(e)}", exc_info=True)
+        logger.error("❌ Error in test-ai: %s", e, exc_info=True)
         return {
             "error": "An error occurred during AI testing",
             "system": "enhanced_ai",
@@ -416,12 +508,12 @@ async def proxy_wix_endpoint(request: Request, api: str):
             "x-user-email": request.headers.get("x-user-email", ""),
             "x-wix-request": "true"
         }
-        logger.info(f"📡 Proxying request to: {url}")
+        logger.info("📡 Proxying request to: %s", url)
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         return response.json()
     except Exception as e:
-        logger.error(f"❌ Proxy error for {api}: {str(e)}", exc_info=True)
+        logger.error("❌ Proxy error for %s: %s", api, e, exc_info=True)
         return {"success": False, "error": "Failed to process proxy request", "code": "PROXY_ERROR"}
 
 @app.get("/test-wix")
@@ -431,8 +523,12 @@ async def test_wix():
         logger.info("🧪 Testing enhanced Wix integration...")
         
         if use_ai_system:
-            connection_ok = await wix_client.test_connection()
-            new_arrivals = await wix_client.get_new_arrivals(3)
+            # Independent network calls, so overlap them
+            connection_ok, new_arrivals = await asyncio.gather(
+                bounded_probe(wix_client.test_connection(), False),
+                # Bypass the catalog cache so the probe really reaches Wix
+                bounded_probe(wix_client.get_catalog("new_arrivals", 3, use_cache=False), {})
+            )
             
             test_results = {
                 "new_arrivals": len(new_arrivals) > 0,
@@ -457,8 +553,11 @@ async def test_wix():
                 "test_status": "success" if connection_ok and new_arrivals else "partial"
             }
         else:
-            connection_ok = legacy_wix_client.test_connection()
-            new_arrivals = legacy_wix_client.get_new_arrivals(3)
+            # The legacy client blocks, so run both calls in worker threads
+            connection_ok, new_arrivals = await asyncio.gather(
+                asyncio.to_thread(legacy_wix_client.test_connection),
+                asyncio.to_thread(legacy_wix_client.get_new_arrivals, 3)
+            )
             
             return {
                 "system": "legacy_fallback",
@@ -469,7 +568,7 @@ async def test_wix():
                 "test_status": "success" if connection_ok and new_arrivals else "failed"
             }
     except Exception as e:
-        logger.error(f"❌ Error in test-wix: {str(e)}", exc_info=True)
+        logger.error("❌ Error in test-wix: %s", e, exc_info=True)
         return {
             "error": "An error occurred during Wix testing",
             "system": "enhanced_ai" if use_ai_system else "legacy_fallback",
@@ -514,7 +613,7 @@ async def agent_info():
                 "Error handling and recovery"
             ],
             "ai_model": "llama-3.3-70b-versatile",
-            "agent_healthy": agent.is_healthy() if 'agent' in globals() else False,
+            "agent_healthy": agent.is_healthy(),
             "supported_queries": [
                 "Check my order ABC123",
                 "Status of orders ABC123, XYZ789",
@@ -568,7 +667,7 @@ async def memory_test():
             "test_status": "healthy"
         }
     except Exception as e:
-        logger.error(f"❌ Error in memory-test: {str(e)}", exc_info=True)
+        logger.error("❌ Error in memory-test: %s", e, exc_info=True)
         return {
             "error": "An error occurred during memory testing",
             "system": "enhanced_ai",
@@ -576,10 +675,10 @@ async def memory_test():
         }
 
 if __name__ == "__main__":
-    logger.info(f"🚀 Starting Enhanced AI Customer Service Bot v4.0...")
-    logger.info(f"📡 Wix URL: {WIX_BASE_URL}")
-    logger.info(f"🔑 Groq API Key: {'✅ Set' if GROQ_API_KEY else '❌ Missing'}")
-    logger.info(f"🤖 System: {'Enhanced AI (Advanced Order Management!)' if use_ai_system else 'Legacy Fallback'}")
+    logger.info("🚀 Starting Enhanced AI Customer Service Bot v4.0...")
+    logger.info("📡 Wix URL: %s", WIX_BASE_URL)
+    logger.info("🔑 Groq API Key: %s", '✅ Set' if GROQ_API_KEY else '❌ Missing')
+    logger.info("🤖 System: %s", 'Enhanced AI (Advanced Order Management!)' if use_ai_system else 'Legacy Fallback')
     
     if use_ai_system:
         logger.info("✨ NEW ENHANCED FEATURES:")
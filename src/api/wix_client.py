@@ -1,16 +1,47 @@
 # src/api/wix_client.py - ENHANCED VERSION WITH NEW ORDER ENDPOINTS
 import aiohttp
 import asyncio
-from typing import Dict, List, Any, Optional
+import time
+from types import MappingProxyType
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 class WixAPIClient:
     """Enhanced client for interacting with Wix API endpoints with advanced order management"""
     
+    # Identification headers sent with every request
+    _BASE_HEADERS = MappingProxyType({
+        'User-Agent': 'ai-customer-service-bot/4.0-enhanced',
+        'X-Bot-Request': 'true',
+        'Content-Type': 'application/json',
+        'X-Bot-Version': '4.0',
+        'X-Feature-Set': 'enhanced-order-management'
+    })
+    
+    # Catalog endpoint -> wording used in logs and error messages
+    _CATALOG_LABELS = MappingProxyType({
+        "new_arrivals": "new arrivals",
+        "mens_products": "men's products",
+        "womens_products": "women's products"
+    })
+    
     def __init__(self, base_url: str):
         self.base_url = base_url.rstrip('/')
         self.timeout = aiohttp.ClientTimeout(total=30)
         
+        # One long-lived HTTP session (created lazily inside the event loop) so
+        # requests reuse pooled keep-alive connections instead of new TCP/TLS handshakes
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+        # Short-lived cache for catalog reads, which change rarely and are the
+        # same for every user; per-key locks collapse concurrent misses
+        self.catalog_ttl = 60
+        self._catalog_cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        self._catalog_locks: Dict[Tuple, asyncio.Lock] = {}
+        
         # Available endpoints - ENHANCED with new order capabilities
         self.endpoints = {
             # Product endpoints (unchanged)
@@ -34,195 +65,168 @@ class WixAPIClient:
             "user_order_stats": f"{self.base_url}/_functions/getUserOrderStats"
         }
         
-        print(f"🔗 Enhanced WixAPIClient initialized with base URL: {self.base_url}")
-        print(f"📋 Available endpoints: {len(self.endpoints)} total")
-        print(f"🆕 New order endpoints: multiple_order_status, last_orders, recent_orders, orders_by_status, user_order_stats")
+        logger.info("🔗 Enhanced WixAPIClient initialized with base URL: %s", self.base_url)
+        logger.info("📋 Available endpoints: %s total", len(self.endpoints))
+        logger.info("🆕 New order endpoints: multiple_order_status, last_orders, recent_orders, orders_by_status, user_order_stats")
     
     def _get_headers(self, user_id: str = None) -> Dict[str, str]:
         """Get headers for requests with enhanced bot identification"""
-        headers = {
-            'User-Agent': 'ai-customer-service-bot/4.0-enhanced',
-            'X-Bot-Request': 'true',
-            'Content-Type': 'application/json',
-            'X-Bot-Version': '4.0',
-            'X-Feature-Set': 'enhanced-order-management'
-        }
+        headers = dict(self._BASE_HEADERS)
         
         # Add user ID to headers when available
         if user_id:
             headers['X-User-Id'] = user_id
-            print(f"🔑 Added user ID to headers: {user_id}")
+            logger.debug("🔑 Added user ID to headers: %s", user_id)
         
         return headers
     
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60)
+            )
+        return self._session
+    
+    async def close(self) -> None:
+        """Close the shared HTTP session and its pooled connections"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    @staticmethod
+    def _network_error(error: Exception, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Standard result for a request that failed before Wix answered"""
+        return {
+            "success": False,
+            "metric_value": [],
+            "error": str(error),
+            "code": "NETWORK_ERROR",
+            "context": context
+        }
+    
+    async def _cached_catalog(self, key: Tuple, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Serve a catalog read from cache, fetching at most once per key when stale"""
+        cached = self._catalog_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.catalog_ttl:
+            return cached[1]
+        
+        lock = self._catalog_locks.get(key)
+        if lock is None:
+            lock = self._catalog_locks[key] = asyncio.Lock()
+        
+        async with lock:
+            # Another request may have refreshed the entry while we waited
+            cached = self._catalog_cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.catalog_ttl:
+                return cached[1]
+            
+            result = await fetch()
+            
+            # Only successful responses are cached so failures are retried
+            if result.get("success"):
+                self._catalog_cache[key] = (time.monotonic(), result)
+            
+            return result
+    
     # ============== PRODUCT METHODS (Unchanged) ==============
     
+    async def get_catalog(self, kind: str, limit: int = 8, use_cache: bool = True) -> Dict[str, Any]:
+        """Fetch one catalog listing (new_arrivals, mens_products or womens_products), briefly cached"""
+        if not use_cache:
+            return await self._fetch_catalog(kind, limit)
+        return await self._cached_catalog((kind, limit), lambda: self._fetch_catalog(kind, limit))
+    
     async def get_new_arrivals(self, limit: int = 8) -> Dict[str, Any]:
-        """Fetch new arrivals from Wix"""
-        try:
-            print(f"📡 Fetching new arrivals (limit: {limit})")
-
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["new_arrivals"],
-                    params={"limit": limit},
-                    headers=self._get_headers()
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved {len(data.get('metric_value', []))} new arrivals")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        print(f"❌ API returned status {response.status}")
-                        text = await response.text()
-                        print(f"Response: {text}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": "Failed to retrieve new arrivals",
-                            "code": "API_ERROR",
-                            "context": {"type": "new_arrivals"}
-                        }
-
-        except Exception as e:
-            print(f"❌ Error fetching new arrivals: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "new_arrivals"}
-            }
+        """Fetch new arrivals from Wix (briefly cached)"""
+        return await self.get_catalog("new_arrivals", limit)
+    
     async def get_mens_products(self, limit: int = 8) -> Dict[str, Any]:
-        """Fetch men's products from Wix"""
-        try:
-            print(f"👔 Fetching men's products (limit: {limit})")
-
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["mens_products"],
-                    params={"limit": limit},
-                    headers=self._get_headers()
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved {len(data.get('metric_value', []))} men's products")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        print(f"❌ API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": "Failed to retrieve men's products",
-                            "code": "API_ERROR",
-                            "context": {"type": "mens_products"}
-                        }
-
-        except Exception as e:
-            print(f"❌ Error fetching men's products: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "mens_products"}
-            }
-
+        """Fetch men's products from Wix (briefly cached)"""
+        return await self.get_catalog("mens_products", limit)
+    
     async def get_womens_products(self, limit: int = 8) -> Dict[str, Any]:
-        """Fetch women's products from Wix"""
+        """Fetch women's products from Wix (briefly cached)"""
+        return await self.get_catalog("womens_products", limit)
+    
+    async def _fetch_catalog(self, kind: str, limit: int) -> Dict[str, Any]:
+        """Fetch a catalog listing from Wix"""
+        label = self._CATALOG_LABELS[kind]
+        
         try:
-            print(f"👗 Fetching women's products (limit: {limit})")
-
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["womens_products"],
-                    params={"limit": limit},
-                    headers=self._get_headers()
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved {len(data.get('metric_value', []))} women's products")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        print(f"❌ API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": "Failed to retrieve women's products",
-                            "code": "API_ERROR",
-                            "context": {"type": "womens_products"}
-                        }
+            logger.debug("📡 Fetching %s (limit: %s)", label, limit)
+
+            session = self._get_session()
+            async with session.get(
+                self.endpoints[kind],
+                params={"limit": limit},
+                headers=self._get_headers()
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved %s %s", len(data.get('metric_value', [])), label)
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    logger.warning("❌ API returned status %s for %s", response.status, label)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Response: %s", await response.text())
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": f"Failed to retrieve {label}",
+                        "code": "API_ERROR",
+                        "context": {"type": kind}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching women's products: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "womens_products"}
-            }
+            logger.error("❌ Error fetching %s: %s", label, e)
+            return self._network_error(e, {"type": kind})
 
     async def search_products(self, query: str, limit: int = 8) -> Dict[str, Any]:
         """Search products by query"""
         try:
-            print(f"🔍 Searching products for: {query}")
-
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["search_products"],
-                    params={"query": query, "limit": limit},
-                    headers=self._get_headers()
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Found {len(data.get('metric_value', []))} products for query: {query}")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        print(f"❌ Search API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": "Failed to search products",
-                            "code": "API_ERROR",
-                            "context": {"type": "search_products"}
-                        }
+            logger.debug("🔍 Searching products for: %s", query)
+
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["search_products"],
+                params={"query": query, "limit": limit},
+                headers=self._get_headers()
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Found %s products for query: %s", len(data.get('metric_value', [])), query)
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    logger.warning("❌ Search API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": "Failed to search products",
+                        "code": "API_ERROR",
+                        "context": {"type": "search_products"}
+                    }
 
         except Exception as e:
-            print(f"❌ Error searching products: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "search_products"}
-            }
+            logger.error("❌ Error searching products: %s", e)
+            return self._network_error(e, {"type": "search_products"})
 
     # ============== EXISTING ORDER METHODS (Enhanced) ==============
 
     async def get_order_items(self, order_id: str, user_id: str = None) -> Dict[str, Any]:
         try:
-            print(f"📋 Fetching order items for order: {order_id}, user: {user_id}")
+            logger.debug("📋 Fetching order items for order: %s, user: %s", order_id, user_id)
             
             params = {"orderId": order_id}
             if user_id:
@@ -230,32 +234,32 @@ class WixAPIClient:
             
             headers = self._get_headers(user_id)
             
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["order_items"],
-                    params=params,
-                    headers=headers
-                ) as response:
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["order_items"],
+                params=params,
+                headers=headers
+            ) as response:
+                
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("Order items API response: %s", data)
+                    logger.debug("✅ Retrieved order items for order: %s", order_id)
+                    return {
+                        "success": True,
+                        **data
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Order items API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "error": error_data.get("error", "Failed to retrieve order items"),
+                        "code": error_data.get("code", "API_ERROR")
+                    }
                     
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Raw response: {data}") # Add this log to inspect the response
-                        print(f"✅ Retrieved order items for order: {order_id}")
-                        return {
-                            "success": True,
-                            **data
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Order items API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "error": error_data.get("error", "Failed to retrieve order items"),
-                            "code": error_data.get("code", "API_ERROR")
-                        }
-                        
         except Exception as e:
-            print(f"❌ Error fetching order items: {e}")
+            logger.error("❌ Error fetching order items: %s", e)
             return {
                 "success": False,
                 "error": str(e),
@@ -265,7 +269,7 @@ class WixAPIClient:
     async def get_order_summary(self, order_id: str, user_id: str = None) -> Dict[str, Any]:
         """Get order summary - Enhanced"""
         try:
-            print(f"📊 Fetching order summary for order: {order_id}, user: {user_id}")
+            logger.debug("📊 Fetching order summary for order: %s, user: %s", order_id, user_id)
 
             params = {"orderId": order_id}
             if user_id:
@@ -273,46 +277,40 @@ class WixAPIClient:
 
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["order_summary"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved order summary")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Order summary API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve order summary"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "order_summary", "orderId": order_id}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["order_summary"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved order summary")
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Order summary API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve order summary"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "order_summary", "orderId": order_id}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching order summary: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "order_summary", "orderId": order_id}
-            }
+            logger.error("❌ Error fetching order summary: %s", e)
+            return self._network_error(e, {"type": "order_summary", "orderId": order_id})
 
     async def get_user_orders(self, user_id: str, limit: int = 20, include_items: bool = False) -> Dict[str, Any]:
         """Get user's orders - Enhanced with more options"""
         try:
-            print(f"📋 Fetching user orders for user: {user_id}, limit: {limit}, include_items: {include_items}")
+            logger.debug("📋 Fetching user orders for user: %s, limit: %s, include_items: %s", user_id, limit, include_items)
 
             if not user_id:
                 return {
@@ -330,48 +328,42 @@ class WixAPIClient:
             }
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["user_orders"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved user orders")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ User orders API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve user orders"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "user_orders", "userId": user_id}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["user_orders"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved user orders")
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ User orders API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve user orders"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "user_orders", "userId": user_id}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching user orders: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "user_orders", "userId": user_id}
-            }
+            logger.error("❌ Error fetching user orders: %s", e)
+            return self._network_error(e, {"type": "user_orders", "userId": user_id})
 
     # ============== NEW: ENHANCED ORDER MANAGEMENT METHODS ==============
 
     async def get_multiple_order_status(self, order_ids: List[str], user_id: str = None) -> Dict[str, Any]:
         """Check status of multiple orders at once - NEW"""
         try:
-            print(f"🔍 Checking multiple order status: {order_ids}, user: {user_id}")
+            logger.debug("🔍 Checking multiple order status: %s, user: %s", order_ids, user_id)
 
             if not order_ids or len(order_ids) == 0:
                 return {
@@ -399,46 +391,40 @@ class WixAPIClient:
 
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["multiple_order_status"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved multiple order status for {len(order_ids)} orders")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Multiple order status API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve multiple order status"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "multiple_order_status", "orderIds": order_ids}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["multiple_order_status"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved multiple order status for %s orders", len(order_ids))
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Multiple order status API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve multiple order status"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "multiple_order_status", "orderIds": order_ids}
+                    }
 
         except Exception as e:
-            print(f"❌ Error checking multiple order status: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "multiple_order_status", "orderIds": order_ids}
-            }
+            logger.error("❌ Error checking multiple order status: %s", e)
+            return self._network_error(e, {"type": "multiple_order_status", "orderIds": order_ids})
 
     async def get_last_orders(self, user_id: str, count: int = 1) -> Dict[str, Any]:
         """Get user's last N orders - NEW"""
         try:
-            print(f"📋 Fetching last {count} orders for user: {user_id}")
+            logger.debug("📋 Fetching last %s orders for user: %s", count, user_id)
 
             if not user_id:
                 return {
@@ -464,45 +450,39 @@ class WixAPIClient:
             }
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["last_orders"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved last {count} orders")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Last orders API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve last orders"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "last_orders", "userId": user_id}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["last_orders"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved last %s orders", count)
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Last orders API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve last orders"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "last_orders", "userId": user_id}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching last orders: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "last_orders", "userId": user_id}
-            }
+            logger.error("❌ Error fetching last orders: %s", e)
+            return self._network_error(e, {"type": "last_orders", "userId": user_id})
     async def get_recent_orders(self, user_id: str, days: int = 30) -> Dict[str, Any]:
         """Get user's orders from last N days - NEW"""
         try:
-            print(f"📅 Fetching orders from last {days} days for user: {user_id}")
+            logger.debug("📅 Fetching orders from last %s days for user: %s", days, user_id)
 
             if not user_id:
                 return {
@@ -528,45 +508,39 @@ class WixAPIClient:
             }
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["recent_orders"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved orders from last {days} days")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Recent orders API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve recent orders"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "recent_orders", "userId": user_id}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["recent_orders"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved orders from last %s days", days)
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Recent orders API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve recent orders"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "recent_orders", "userId": user_id}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching recent orders: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "recent_orders", "userId": user_id}
-            }
+            logger.error("❌ Error fetching recent orders: %s", e)
+            return self._network_error(e, {"type": "recent_orders", "userId": user_id})
     async def get_orders_by_status(self, user_id: str, status: str, limit: int = 10) -> Dict[str, Any]:
         """Get user's orders filtered by status - NEW"""
         try:
-            print(f"🏷️ Fetching orders with status '{status}' for user: {user_id}")
+            logger.debug("🏷️ Fetching orders with status '%s' for user: %s", status, user_id)
 
             if not user_id:
                 return {
@@ -593,46 +567,40 @@ class WixAPIClient:
             }
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["orders_by_status"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved orders with status '{status}'")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Orders by status API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve orders by status"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "orders_by_status", "status": status}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["orders_by_status"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved orders with status '%s'", status)
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Orders by status API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve orders by status"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "orders_by_status", "status": status}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching orders by status: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "orders_by_status", "status": status}
-            }
+            logger.error("❌ Error fetching orders by status: %s", e)
+            return self._network_error(e, {"type": "orders_by_status", "status": status})
 
     async def get_user_order_stats(self, user_id: str) -> Dict[str, Any]:
         """Get comprehensive order statistics for user - NEW"""
         try:
-            print(f"📊 Fetching order statistics for user: {user_id}")
+            logger.debug("📊 Fetching order statistics for user: %s", user_id)
 
             if not user_id:
                 return {
@@ -646,41 +614,35 @@ class WixAPIClient:
             params = {"userId": user_id}
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["user_order_stats"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        print(f"✅ Retrieved order statistics")
-                        return {
-                            "success": data.get("success", False),
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        error_data = await response.json() if response.content_type == 'application/json' else {}
-                        print(f"❌ Order statistics API returned status {response.status}")
-                        return {
-                            "success": False,
-                            "metric_value": [],
-                            "error": error_data.get("error", "Failed to retrieve order statistics"),
-                            "code": error_data.get("code", "API_ERROR"),
-                            "context": {"type": "user_order_stats", "userId": user_id}
-                        }
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["user_order_stats"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    logger.debug("✅ Retrieved order statistics")
+                    return {
+                        "success": data.get("success", False),
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    error_data = await response.json() if response.content_type == 'application/json' else {}
+                    logger.warning("❌ Order statistics API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": error_data.get("error", "Failed to retrieve order statistics"),
+                        "code": error_data.get("code", "API_ERROR"),
+                        "context": {"type": "user_order_stats", "userId": user_id}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching order statistics: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "user_order_stats", "userId": user_id}
-            }
+            logger.error("❌ Error fetching order statistics: %s", e)
+            return self._network_error(e, {"type": "user_order_stats", "userId": user_id})
 
     # ============== HELPER AND UTILITY METHODS ==============
 
@@ -688,7 +650,7 @@ class WixAPIClient:
     async def get_order_status(self, order_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
         """Legacy order status method - maintained for backward compatibility"""
         try:
-            print(f"📋 Fetching legacy order status: {order_id}")
+            logger.debug("📋 Fetching legacy order status: %s", order_id)
 
             params = {"orderId": order_id}
             if user_id:
@@ -696,74 +658,69 @@ class WixAPIClient:
 
             headers = self._get_headers(user_id)
 
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.get(
-                    self.endpoints["order_status"],
-                    params=params,
-                    headers=headers
-                ) as response:
-
-                    if response.status == 200:
-                        data = await response.json()
-                        if 'error' in data:
-                            print(f"❌ Legacy order status error: {data['error']}")
-                            return {
-                                "success": False,
-                                "metric_value": [],
-                                "error": data.get("error", "Unknown error"),
-                                "code": data.get("code", "API_ERROR"),
-                                "context": {"type": "order_status", "orderId": order_id}
-                            }
-                        print(f"✅ Retrieved legacy order status")
-                        return {
-                            "success": True,
-                            "metric_value": data.get("metric_value", []),
-                            "context": data.get("context", {})
-                        }
-                    else:
-                        print(f"❌ Legacy order status API returned status {response.status}")
+            session = self._get_session()
+            async with session.get(
+                self.endpoints["order_status"],
+                params=params,
+                headers=headers
+            ) as response:
+
+                if response.status == 200:
+                    data = await response.json()
+                    if 'error' in data:
+                        logger.error("❌ Legacy order status error: %s", data['error'])
                         return {
                             "success": False,
                             "metric_value": [],
-                            "error": "Failed to retrieve order status",
-                            "code": "API_ERROR",
+                            "error": data.get("error", "Unknown error"),
+                            "code": data.get("code", "API_ERROR"),
                             "context": {"type": "order_status", "orderId": order_id}
                         }
+                    logger.debug("✅ Retrieved legacy order status")
+                    return {
+                        "success": True,
+                        "metric_value": data.get("metric_value", []),
+                        "context": data.get("context", {})
+                    }
+                else:
+                    logger.warning("❌ Legacy order status API returned status %s", response.status)
+                    return {
+                        "success": False,
+                        "metric_value": [],
+                        "error": "Failed to retrieve order status",
+                        "code": "API_ERROR",
+                        "context": {"type": "order_status", "orderId": order_id}
+                    }
 
         except Exception as e:
-            print(f"❌ Error fetching legacy order status: {e}")
-            return {
-                "success": False,
-                "metric_value": [],
-                "error": str(e),
-                "code": "NETWORK_ERROR",
-                "context": {"type": "order_status", "orderId": order_id}
-            }
+            logger.error("❌ Error fetching legacy order status: %s", e)
+            return self._network_error(e, {"type": "order_status", "orderId": order_id})
     
     async def test_connection(self) -> bool:
         """Test connection to Wix API - Enhanced with more comprehensive testing"""
         try:
-            print("🔧 Testing enhanced Wix API connection...")
+            logger.info("🔧 Testing enhanced Wix API connection...")
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
-                # Test basic product endpoint
-                async with session.get(
-                    self.endpoints["new_arrivals"],
-                    params={"limit": 1},
-                    headers=self._get_headers()
-                ) as response:
-                    
-                    success = response.status == 200
-                    print(f"{'✅' if success else '❌'} Basic API connection test: {'passed' if success else 'failed'}")
-                    
-                    if success:
-                        print(f"🆕 Enhanced order endpoints available: {len([k for k in self.endpoints.keys() if 'order' in k])}")
-                        print(f"🎯 Total API endpoints: {len(self.endpoints)}")
-                    
-                    return success
-                    
+            session = self._get_session()
+            # Test basic product endpoint
+            async with session.get(
+                self.endpoints["new_arrivals"],
+                params={"limit": 1},
+                headers=self._get_headers(),
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                
+                success = response.status == 200
+                logger.info("%s Basic API connection test: %s", '✅' if success else '❌', 'passed' if success else 'failed')
+                
+                if success:
+                    logger.info("🆕 Enhanced order endpoints available: %s", len([k for k in self.endpoints.keys() if 'order' in k]))
+                    logger.info("🎯 Total API endpoints: %s", len(self.endpoints))
+                
+                return success
+                
         except Exception as e:
-            print(f"❌ Enhanced Wix API connection test failed: {e}")
+            logger.error("❌ Enhanced Wix API connection test failed: %s", e)
             return False
 
     def get_available_endpoints(self) -> Dict[str, str]:
@@ -787,29 +744,33 @@ class WixAPIClient:
             "Bot request identification"
         ]
 
+    async def _probe_endpoint(self, endpoint_name: str) -> bool:
+        """Check that a single endpoint answers with HTTP 200"""
+        try:
+            session = self._get_session()
+            async with session.get(
+                self.endpoints[endpoint_name],
+                params={"limit": 1} if "arrivals" in endpoint_name else {"query": "test", "limit": 1},
+                headers=self._get_headers(),
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as response:
+                return response.status == 200
+        except Exception:
+            return False
+    
     async def health_check(self) -> Dict[str, Any]:
         """Comprehensive health check of all systems"""
         try:
-            print("🏥 Running comprehensive health check...")
-            
-            # Test basic connection
-            connection_ok = await self.test_connection()
-            
-            # Test a few key endpoints
-            endpoint_tests = {}
-            test_endpoints = ["new_arrivals", "search_products"]
+            logger.info("🏥 Running comprehensive health check...")
             
-            for endpoint_name in test_endpoints:
-                try:
-                    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
-                        async with session.get(
-                            self.endpoints[endpoint_name],
-                            params={"limit": 1} if "arrivals" in endpoint_name else {"query": "test", "limit": 1},
-                            headers=self._get_headers()
-                        ) as response:
-                            endpoint_tests[endpoint_name] = response.status == 200
-                except Exception:
-                    endpoint_tests[endpoint_name] = False
+            # Test basic connection and a few key endpoints concurrently;
+            # test_connection already fetches new arrivals, so it isn't probed again
+            test_endpoints = ["search_products"]
+            connection_ok, *endpoint_results = await asyncio.gather(
+                self.test_connection(),
+                *(self._probe_endpoint(endpoint_name) for endpoint_name in test_endpoints)
+            )
+            endpoint_tests = dict(zip(test_endpoints, endpoint_results))
             
             return {
                 "overall_health": connection_ok,
@@ -1,16 +1,60 @@
 # src/bot/pure_ai_agent.py - ENHANCED VERSION WITH NEW ORDER CAPABILITIES
 import asyncio
+import contextlib
 import json
-import re
-from typing import Dict, Any, Optional, List
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import AsyncIterator, Dict, Any, Optional, List, Tuple
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from .session_memory import session_memory
 
+logger = logging.getLogger(__name__)
+
+# Trivial small talk is answered directly, without any LLM call
+_SMALL_TALK = MappingProxyType({
+    "hi": "greeting", "hello": "greeting", "hey": "greeting",
+    "thanks": "thanks", "thank you": "thanks",
+    "bye": "farewell", "goodbye": "farewell"
+})
+_SMALL_TALK_MAX_LENGTH = 11  # "thank you !" - the longest phrase, a space and one punctuation mark
+_SMALL_TALK_REPLIES = {
+    "greeting": "👋 Hello! I can help you discover new arrivals, search for products, or check on your orders. What can I do for you today?",
+    "thanks": "You're welcome! 😊 Is there anything else I can help you with?",
+    "farewell": "Thanks for stopping by! 👋 Come back anytime you need help with shopping or your orders."
+}
+
+# Result types that share a formatting branch, classified with one hash lookup
+_ORDER_LIST_TYPES = frozenset({"last_orders", "recent_orders", "orders_by_status"})
+_PRODUCT_LIST_TYPES = frozenset({"new_arrivals", "mens_products", "womens_products", "search_results"})
+_CATALOG_ACTIONS = frozenset({"show_new_arrivals", "show_mens_products", "show_womens_products"})
+
+# Rejections for order actions without a user; read-only since they're shared
+_AUTH_REQUIRED = MappingProxyType({
+    "success": False,
+    "error": "User authentication required",
+    "type": "auth_error"
+})
+_ORDER_STATUS_AUTH_REQUIRED = MappingProxyType({
+    **_AUTH_REQUIRED,
+    "error": "User authentication required to check order status",
+    "help_message": "Please make sure you're logged in to check your order status"
+})
+
 class PureAIAgent:
     """Enhanced Pure AI-driven customer service agent with advanced order management"""
     
+    # Canned help answers by topic, built once at import
+    _HELP_TOPICS = MappingProxyType({
+        "general help": "I'm here to assist with shopping, order tracking, or store policies! What do you need help with? You can ask about new arrivals, specific products, or check an order status.",
+        "returns": "Our return policy allows returns within 30 days of delivery. Items must be unworn and in original condition. Want to start a return or need more details?",
+        "shipping": "We offer standard and express shipping options. Standard shipping takes 5-7 business days. Need to check your order's shipping status or learn more?",
+        "payment": "We accept all major credit cards, PayPal, and Apple Pay. Having trouble with a payment or need help with something specific?"
+    })
+    
     def __init__(self, groq_api_key: str, wix_client):
         self.wix_client = wix_client
         self.memory = session_memory
@@ -23,20 +67,48 @@ class PureAIAgent:
                 max_tokens=1200,
                 groq_api_key=groq_api_key
             )
-            print("✅ Enhanced Pure AI Agent LLM initialized")
+            # Intent classification emits a short JSON object, so it runs on a
+            # smaller, deterministic model with a tight token budget
+            self.llm_small = ChatGroq(
+                model_name="llama-3.1-8b-instant",
+                temperature=0.0,
+                max_tokens=256,
+                groq_api_key=groq_api_key
+            )
+            logger.info("✅ Enhanced Pure AI Agent LLM initialized")
         except Exception as e:
-            print(f"❌ Error initializing LLM in Pure AI Agent: {e}")
+            logger.error("❌ Error initializing LLM in Pure AI Agent: %s", e, exc_info=True)
             raise
         
+        # Dedicated pool for blocking chain.invoke calls so LLM traffic doesn't
+        # starve the loop's default executor
+        self._llm_pool = ThreadPoolExecutor(max_workers=64, thread_name_prefix="llm")
+        
         # Create AI chains
         self.intent_analyzer = self._create_intent_analyzer()
         self.response_generator = self._create_response_generator()
+        self.error_handler = self._create_error_handler()
+        
+        # LRU of intent analyses keyed on (normalized message, conversation context);
+        # the classifier runs at temperature 0 so identical inputs give identical output
+        self._intent_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._intent_cache_size = 4096
         
-        print("✅ Enhanced Pure AI Agent initialized with ADVANCED ORDER MANAGEMENT!")
+        # Memory request type -> handler, resolved with one lookup per request
+        self._memory_handlers = MappingProxyType({
+            "previous_user_message": self._recall_previous_user_message,
+            "previous_bot_message": self._recall_previous_bot_message,
+            "conversation_summary": self._recall_conversation_summary,
+            "order_id_history": self._recall_order_id_history
+        })
+        
+        logger.info("✅ Enhanced Pure AI Agent initialized with ADVANCED ORDER MANAGEMENT!")
     
     def _create_intent_analyzer(self):
         """Enhanced AI that understands customer intent including advanced order queries"""
         
+        # The system prompt is fully static so providers can reuse it as a cached
+        # prefix; all per-turn data goes in the human message
         system_prompt = """You are an AI assistant that analyzes customer messages for an online clothing store.
 
 You have access to conversation history and can handle complex order-related queries.
@@ -115,14 +187,7 @@ Key Intelligence Guidelines:
 - Default to reasonable limits: last_orders max 20, recent_orders max 365 days
 - Handle context references using conversation history
 - When user says "help with orders" without specifics, default to showing recent orders
-- Be intelligent about understanding natural language variations
-
-Conversation History Context:
-{conversation_context}
-
-Current Message: {message}
-
-Analyze this customer message considering the conversation context above."""
+- Be intelligent about understanding natural language variations"""
 
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
@@ -135,11 +200,12 @@ Current Message: {message}
 Analyze this customer message considering the conversation context above.""")
         ])
         
-        return prompt | self.llm | JsonOutputParser()
+        return prompt | self.llm_small | JsonOutputParser()
     
     def _create_response_generator(self):
         """Enhanced AI response generator for all order types"""
         
+        # Static system prompt (cacheable prefix); result data goes in the human message
         system_prompt = """You are a customer service representative for an online clothing store.
 
 Handle different types of responses based on the result type:
@@ -190,17 +256,7 @@ Handle different types of responses based on the result type:
 Response Format Examples:
 - "✅ Order ABC123 (Jan 15) - Delivered - $45.99"
 - "📦 Order XYZ789 (Jan 10) - Shipped - 3 items"
-- "⏳ Order DEF456 (Jan 08) - Processing - $123.50"
-
-Data Available:
-- Order ID: {order_id}
-- Order IDs: {order_ids}
-- Total Items: {total_items}
-- Success Status: {was_successful}
-- Orders List: {orders_list}
-- Statistics: {statistics}
-- Error: {error}
-- Context: {context}"""
+- "⏳ Order DEF456 (Jan 08) - Processing - $123.50\""""
 
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
@@ -227,55 +283,140 @@ Generate a response based on the information above.""")
         
         return prompt | self.llm
     
-    async def process_message(self, message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
-        try:
-            print(f"🤖 Enhanced AI processing: {message} (user_id: {user_id})")
-            
-            # Add user message to memory
-            if user_id:
-                self.memory.add_message(user_id, message, 'user')
-            
-            # Get conversation context
-            conversation_context = self.memory.get_conversation_context(user_id) if user_id else "This is the start of the conversation."
-            
-            # Step 1: AI analyzes intent and extracts parameters with context
-            intent_result = await asyncio.to_thread(
-                self.intent_analyzer.invoke,
+    def _create_error_handler(self):
+        """AI chain that apologizes for a failed turn and suggests next steps"""
+        
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are a customer service bot. An error occurred while handling the customer's message. Respond politely and helpfully, suggesting next steps."),
+            ("human", "Error: {error}\n\nCustomer message: {message}")
+        ])
+        
+        return prompt | self.llm
+    
+    async def _ainvoke(self, chain, payload: Dict[str, Any]):
+        """Run a blocking chain.invoke on the shared LLM thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._llm_pool, chain.invoke, payload)
+    
+    async def _analyze_and_execute(self, message: str, user_id: Optional[str]) -> Dict[str, Any]:
+        """Record the user message, analyze its intent and run the chosen action"""
+        # Add user message to memory
+        if user_id:
+            self.memory.add_message(user_id, message, 'user')
+        
+        # Get conversation context
+        conversation_context = self.memory.get_conversation_context(user_id) if user_id else "This is the start of the conversation."
+        
+        # Step 1: AI analyzes intent and extracts parameters with context
+        cache_key = (message.strip().lower(), conversation_context)
+        intent_result = self._intent_cache.get(cache_key)
+        
+        if intent_result is not None:
+            self._intent_cache.move_to_end(cache_key)
+            logger.info("🧠 Intent cache hit: %s", intent_result)
+        else:
+            intent_result = await self._ainvoke(
+                self.intent_analyzer,
                 {
                     "message": message,
                     "conversation_context": conversation_context
                 }
             )
+            logger.info("🧠 Enhanced AI Intent Analysis: %s", intent_result)
+            self._remember_intent(cache_key, intent_result)
+        
+        action = intent_result.get("action", "general_help")
+        # Copy so per-request additions never leak into the cached analysis
+        parameters = dict(intent_result.get("parameters", {}))
+        
+        # Pass user_id to action execution
+        if user_id:
+            parameters["user_id"] = user_id
+        
+        # Step 2: Execute the appropriate action
+        action_result = await self._execute_action(action, parameters)
+        
+        logger.info("🔧 Action '%s' executed: %s", action, action_result.get('success', False))
+        
+        return {
+            "conversation_context": conversation_context,
+            "action": action,
+            "confidence": intent_result.get("confidence", 0.8),
+            "reasoning": intent_result.get("reasoning", ""),
+            "action_result": action_result
+        }
+    
+    def _small_talk_reply(self, message: str, user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Answer greetings, thanks and goodbyes without running any chain"""
+        text = message.strip()
+        if len(text) > _SMALL_TALK_MAX_LENGTH:
+            return None  # Most messages stop here without any further allocation
+        
+        if text[-1:] in ("!", "."):
+            text = text[:-1].rstrip()
+        
+        kind = _SMALL_TALK.get(text.casefold())
+        if not kind:
+            return None
+        
+        response = _SMALL_TALK_REPLIES[kind]
+        logger.info("⚡ Small talk (%s) answered without LLM", kind)
+        
+        if user_id:
+            self.memory.add_message(user_id, message, 'user')
+            self.memory.add_message(user_id, response, 'bot')
+        
+        return {
+            "response": response,
+            "render": [],
+            "confidence": 0.99,
+            "action": "general_help",
+            "success": True,
+            "reasoning": f"Recognized {kind} small talk"
+        }
+    
+    def _remember_intent(self, cache_key: Tuple[str, str], intent_result: Any) -> None:
+        """Store an intent analysis, evicting the least recently used entry when full"""
+        if not isinstance(intent_result, dict):
+            return
+        
+        self._intent_cache[cache_key] = intent_result
+        if len(self._intent_cache) > self._intent_cache_size:
+            self._intent_cache.popitem(last=False)
+    
+    def _turn_lock(self, user_id: Optional[str]):
+        """Serialize turns per user so concurrent requests can't interleave history"""
+        return self.memory.session_lock(user_id) if user_id else contextlib.nullcontext()
+    
+    async def process_message(self, message: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        async with self._turn_lock(user_id):
+            return await self._process_message(message, user_id)
+    
+    async def _process_message(self, message: str, user_id: Optional[str]) -> Dict[str, Any]:
+        try:
+            logger.info("🤖 Enhanced AI processing: %s (user_id: %s)", message, user_id)
             
-            print(f"🧠 Enhanced AI Intent Analysis: {intent_result}")
-            
-            action = intent_result.get("action", "general_help")
-            parameters = intent_result.get("parameters", {})
-            confidence = intent_result.get("confidence", 0.8)
-            reasoning = intent_result.get("reasoning", "")
-            
-            # Pass user_id to action execution
-            if user_id:
-                parameters["user_id"] = user_id
-            
-            # Step 2: Execute the appropriate action
-            action_result = await self._execute_action(action, parameters)
+            small_talk = self._small_talk_reply(message, user_id)
+            if small_talk:
+                return small_talk
             
-            print(f"🔧 Action '{action}' executed: {action_result.get('success', False)}")
+            turn = await self._analyze_and_execute(message, user_id)
+            action = turn["action"]
+            action_result = turn["action_result"]
             
             # Step 3: Generate natural customer response
             was_successful = action_result.get("success", True)
-            print(f"🤖 Telling AI that success = {was_successful}")
+            logger.info("🤖 Telling AI that success = %s", was_successful)
             
             response_data = await self._generate_natural_response(
                 original_message=message,
                 action_taken=action,
                 function_result=action_result,
                 was_successful=was_successful,
-                conversation_context=conversation_context
+                conversation_context=turn["conversation_context"]
             )
             
-            print(f"💬 AI generated response (first 100 chars): {response_data['content'][:100]}...")
+            logger.info("💬 AI generated response (first 100 chars): %.100s...", response_data['content'])
             
             # Add bot response to memory
             if user_id:
@@ -284,18 +425,87 @@ Generate a response based on the information above.""")
             return {
                 "response": response_data['content'],
                 "render": response_data['render'],  # Include render instructions
-                "confidence": confidence,
+                "confidence": turn["confidence"],
                 "action": action,
                 "success": action_result.get("success", True),
-                "reasoning": reasoning
+                "reasoning": turn["reasoning"]
             }
             
         except Exception as e:
-            print(f"❌ Error in Enhanced Pure AI Agent: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("❌ Error in Enhanced Pure AI Agent: %s", e, exc_info=True)
             
             return await self._handle_error_intelligently(message, str(e))
+    
+    async def process_message_stream(self, message: str, user_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the reply while it is generated
+        
+        Once the action has run, yields a {"type": "render", ...} event with the
+        render instructions for the fetched orders/products so the UI can draw
+        them before any prose arrives. Then yields {"type": "token", "content": ...}
+        events as the response generator decodes, and a single {"type": "done", ...}
+        event carrying the same metadata as process_message. The bot message is
+        stored in memory only once the stream completes.
+        """
+        async with self._turn_lock(user_id):
+            async for event in self._process_message_stream(message, user_id):
+                yield event
+    
+    async def _process_message_stream(self, message: str, user_id: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            logger.info("🤖 Enhanced AI streaming: %s (user_id: %s)", message, user_id)
+            
+            small_talk = self._small_talk_reply(message, user_id)
+            if small_talk:
+                yield {"type": "token", "content": small_talk.pop("response")}
+                yield {"type": "done", **small_talk}
+                return
+            
+            turn = await self._analyze_and_execute(message, user_id)
+        except Exception as e:
+            logger.error("❌ Error in Enhanced Pure AI Agent stream: %s", e, exc_info=True)
+            result = await self._handle_error_intelligently(message, str(e))
+            yield {"type": "token", "content": result.pop("response")}
+            yield {"type": "done", "render": [], **result}
+            return
+        
+        action = turn["action"]
+        action_result = turn["action_result"]
+        was_successful = action_result.get("success", True)
+        
+        chunks = []
+        render_list = []
+        try:
+            payload, render_list = self._prepare_response_inputs(message, action, action_result, was_successful)
+            # Fetched data is ready now; the LLM reply takes much longer
+            yield {"type": "render", "render": render_list, "action": action, "success": was_successful}
+            async for text in self._stream_natural_response(payload):
+                chunks.append(text)
+                yield {"type": "token", "content": text}
+        except Exception as e:
+            logger.error("❌ Error streaming natural response: %s", e, exc_info=True)
+            if not chunks:
+                fallback = await self._create_fallback_response(
+                    action=action,
+                    result=action_result,
+                    original_message=message
+                )
+                # Keep render_list: the client may already have drawn it from the render event
+                chunks.append(fallback)
+                yield {"type": "token", "content": fallback}
+        
+        content = "".join(chunks)
+        if user_id:
+            self.memory.add_message(user_id, content, 'bot')
+        
+        yield {
+            "type": "done",
+            "render": render_list,
+            "confidence": turn["confidence"],
+            "action": action,
+            "success": was_successful,
+            "reasoning": turn["reasoning"]
+        }
+    
     async def _execute_action(self, action: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the determined action using enhanced Wix API"""
         try:
@@ -373,14 +583,9 @@ Generate a response based on the information above.""")
                     }
                 
                 if not user_id:
-                    return {
-                        "success": False,
-                        "error": "User authentication required to check order status",
-                        "type": "auth_error",
-                        "help_message": "Please make sure you're logged in to check your order status"
-                    }
+                    return _ORDER_STATUS_AUTH_REQUIRED
                 
-                print(f"🔍 Checking single order: {order_id} (user: {user_id})")
+                logger.info("🔍 Checking single order: %s (user: %s)", order_id, user_id)
                 order_info = await self.wix_client.get_order_items(order_id, user_id)
                 
                 if not order_info.get("success", False):
@@ -395,17 +600,21 @@ Generate a response based on the information above.""")
                         "error_code": error_code
                     }
                 
+                # Status grouping is already computed by the API; read it once
+                order_context = order_info.get("context") or {}
+                status_groups = order_context.get("statusGroups", {})
+                
                 return {
                     "success": True,
                     "type": "order_status",
                     "order_id": order_id,
                     "order_data": order_info,
                     "items": order_info.get("metric_value", []),  # Use metric_value instead of items
-                    "totalItems": order_info.get("context", {}).get("totalItems", 0),  # Access totalItems from context
-                    "itemsSummary": order_info.get("context", {}).get("statusGroups", {}),  # Use statusGroups as itemsSummary
-                    "statusGroups": order_info.get("context", {}).get("statusGroups", {}),
-                    "hasMultipleItems": order_info.get("context", {}).get("hasMultipleItems", False),
-                    "uniqueStatuses": order_info.get("context", {}).get("uniqueStatuses", [])
+                    "totalItems": order_context.get("totalItems", 0),
+                    "itemsSummary": status_groups,  # Use statusGroups as itemsSummary
+                    "statusGroups": status_groups,
+                    "hasMultipleItems": order_context.get("hasMultipleItems", False),
+                    "uniqueStatuses": order_context.get("uniqueStatuses", [])
                 }
             
             # NEW: Multiple order check
@@ -421,13 +630,9 @@ Generate a response based on the information above.""")
                     }
                 
                 if not user_id:
-                    return {
-                        "success": False,
-                        "error": "User authentication required",
-                        "type": "auth_error"
-                    }
+                    return _AUTH_REQUIRED
                 
-                print(f"🔍 Checking multiple orders: {order_ids} (user: {user_id})")
+                logger.info("🔍 Checking multiple orders: %s (user: %s)", order_ids, user_id)
                 result = await self.wix_client.get_multiple_order_status(order_ids, user_id)
                 
                 if not result.get("success", False):
@@ -455,12 +660,8 @@ Generate a response based on the information above.""")
             elif action == "get_last_orders":
                 count = params.get("count", 1)
                 if not user_id:
-                    return {
-                        "success": False,
-                        "error": "User authentication required",
-                        "type": "auth_error"
-                    }
-                print(f"🔍 Getting last {count} orders (user: {user_id})")
+                    return _AUTH_REQUIRED
+                logger.info("🔍 Getting last %s orders (user: %s)", count, user_id)
                 result = await self.wix_client.get_last_orders(user_id, count)
                 if not result.get("success", False):
                     return {
@@ -483,13 +684,9 @@ Generate a response based on the information above.""")
                 days = params.get("days", 30)
                 
                 if not user_id:
-                    return {
-                        "success": False,
-                        "error": "User authentication required",
-                        "type": "auth_error"
-                    }
+                    return _AUTH_REQUIRED
                 
-                print(f"🔍 Getting recent orders (last {days} days, user: {user_id})")
+                logger.info("🔍 Getting recent orders (last %s days, user: %s)", days, user_id)
                 result = await self.wix_client.get_recent_orders(user_id, days)
                 
                 if not result.get("success", False):
@@ -522,13 +719,9 @@ Generate a response based on the information above.""")
                     }
                 
                 if not user_id:
-                    return {
-                        "success": False,
-                        "error": "User authentication required",
-                        "type": "auth_error"
-                    }
+                    return _AUTH_REQUIRED
                 
-                print(f"🔍 Getting orders by status: {status} (user: {user_id})")
+                logger.info("🔍 Getting orders by status: %s (user: %s)", status, user_id)
                 result = await self.wix_client.get_orders_by_status(user_id, status, limit)
                 
                 if not result.get("success", False):
@@ -550,13 +743,9 @@ Generate a response based on the information above.""")
             # NEW: Get order statistics
             elif action == "get_order_stats":
                 if not user_id:
-                    return {
-                        "success": False,
-                        "error": "User authentication required",
-                        "type": "auth_error"
-                    }
+                    return _AUTH_REQUIRED
                 
-                print(f"📊 Getting order statistics (user: {user_id})")
+                logger.info("📊 Getting order statistics (user: %s)", user_id)
                 result = await self.wix_client.get_user_order_stats(user_id)
                 
                 if not result.get("success", False):
@@ -583,7 +772,7 @@ Generate a response based on the information above.""")
                 return await self._generate_contextual_help("general assistance")
                 
         except Exception as e:
-            print(f"❌ Error executing action '{action}': {e}")
+            logger.error("❌ Error executing action '%s': %s", action, e, exc_info=True)
             return {
                 "success": False,
                 "error": str(e),
@@ -601,141 +790,149 @@ Generate a response based on the information above.""")
             }
         
         request_type = params.get("type", "conversation_summary")
+        handler = self._memory_handlers.get(request_type)
         
-        if request_type == "previous_user_message":
-            last_message = self.memory.get_last_user_message(user_id)
+        if handler is None:
             return {
                 "success": True,
                 "type": "memory_response",
-                "request_type": "previous_user_message",
-                "memory_content": last_message or "I don't see any previous messages from you in this conversation.",
-                "found": last_message is not None
+                "request_type": "general",
+                "memory_content": "I remember our conversation and I'm here to help! What would you like to know?"
             }
         
-        elif request_type == "previous_bot_message":
-            last_bot_message = self.memory.get_last_bot_message(user_id)
-            return {
-                "success": True,
-                "type": "memory_response",
-                "request_type": "previous_bot_message",
-                "memory_content": last_bot_message or "I haven't responded to anything yet in this conversation.",
-                "found": last_bot_message is not None
-            }
+        return handler(user_id)
+    
+    def _recall_previous_user_message(self, user_id: str) -> Dict[str, Any]:
+        last_message = self.memory.get_last_user_message(user_id)
+        return {
+            "success": True,
+            "type": "memory_response",
+            "request_type": "previous_user_message",
+            "memory_content": last_message or "I don't see any previous messages from you in this conversation.",
+            "found": last_message is not None
+        }
+    
+    def _recall_previous_bot_message(self, user_id: str) -> Dict[str, Any]:
+        last_bot_message = self.memory.get_last_bot_message(user_id)
+        return {
+            "success": True,
+            "type": "memory_response",
+            "request_type": "previous_bot_message",
+            "memory_content": last_bot_message or "I haven't responded to anything yet in this conversation.",
+            "found": last_bot_message is not None
+        }
+    
+    def _recall_conversation_summary(self, user_id: str) -> Dict[str, Any]:
+        history = self.memory.get_conversation_history(user_id, 10)
+        return {
+            "success": True,
+            "type": "memory_response",
+            "request_type": "conversation_summary",
+            "memory_content": f"We've had {len(history)} messages in our conversation. You can ask about specific details, like orders or products, if you want to dive deeper!",
+            "found": bool(history)
+        }
+    
+    def _recall_order_id_history(self, user_id: str) -> Dict[str, Any]:
+        # Order IDs are extracted once when each message is stored
+        order_ids = self.memory.get_mentioned_order_ids(user_id, 50)
         
-        elif request_type == "conversation_summary":
-            history = self.memory.get_conversation_history(user_id, 10)
-            return {
-                "success": True,
-                "type": "memory_response",
-                "request_type": "conversation_summary",
-                "memory_content": f"We've had {len(history)} messages in our conversation. You can ask about specific details, like orders or products, if you want to dive deeper!",
-                "found": bool(history)
-            }
+        return {
+            "success": True,
+            "type": "memory_response",
+            "request_type": "order_id_history",
+            "memory_content": list(order_ids) if order_ids else "You haven't mentioned any order IDs in our conversation yet.",
+            "found": bool(order_ids)
+        }
+    
+    def _prepare_response_inputs(self, original_message: str, action_taken: str, function_result: Dict[str, Any], was_successful: bool) -> Tuple[Dict[str, Any], List[Any]]:
+        """Build the response generator payload and render instructions for a result"""
+        result_type = function_result.get("type", "general")
+        
+        # Prepare data for response generation
+        order_id = function_result.get("order_id", "")
+        order_ids = function_result.get("order_ids", [])
+        total_items = function_result.get("totalItems", 0)
+        error = function_result.get("error", "")
+        memory_content = function_result.get("memory_content", "")
+        context = function_result.get("context", {})
+        statistics = function_result.get("statistics", {})
         
-        elif request_type == "order_id_history":
-            # Extract order IDs from conversation history
-            history = self.memory.get_conversation_history(user_id, 50)
-            order_ids = set()
-            order_id_pattern = r'\b(order_\w+|cod_\w+)\b'
+        # Format orders list for different result types
+        orders_list = []
+        render_list = []  # New: Store render instructions
+        
+        if result_type == "order_status":
+            # Single order items
+            items = function_result.get("items", [])
+            for item in items:
+                options = item.get("options", {})
+                size = options.get("Size", "N/A")
+                orders_list.append(f"{item.get('name', 'Unknown')} (Size {size}) - {item.get('shipmentStatus', 'Unknown')}")
+                render_list.append(item.get("render", []))  # Include render for items
+        
+        elif result_type == "multiple_order_status":
+            # Multiple order results
+            successful = function_result.get("successful", [])
+            failed = function_result.get("failed", [])
             
-            for message in history:
-                if message.get("sender") == "user":
-                    matches = re.findall(order_id_pattern, message.get("content", ""))
-                    order_ids.update(matches)
+            for order in successful:
+                orders_list.append(f"✅ {order.get('orderId', 'Unknown')} - {order.get('aggregatedStatus', 'Unknown')} - ${order.get('total', 'N/A')}")
+                render_list.append(order.get("render", []))  # Include render for successful orders
             
-            return {
-                "success": True,
-                "type": "memory_response",
-                "request_type": "order_id_history",
-                "memory_content": list(order_ids) if order_ids else "You haven't mentioned any order IDs in our conversation yet.",
-                "found": bool(order_ids)
-            }
+            for order in failed:
+                orders_list.append(f"❌ {order.get('orderId', 'Unknown')} - {order.get('error', 'Error')}")
+                render_list.append([])  # No render for failed orders
         
-        else:
-            return {
-                "success": True,
-                "type": "memory_response",
-                "request_type": "general",
-                "memory_content": "I remember our conversation and I'm here to help! What would you like to know?"
-            }
+        elif result_type in _ORDER_LIST_TYPES:
+            # Order lists - FIXED: Use metric_value instead of orders
+            orders = function_result.get("metric_value", [])  # Changed from "orders" to "metric_value"
+            for order in orders:
+                formatted_date = order.get("formattedDate", "Unknown date")
+                status = order.get("aggregatedStatus", "Unknown")
+                total = order.get("total", 0)
+                orders_list.append(f"📦 {order.get('_id', 'Unknown')} - {formatted_date} - {status} - ${total}")
+                render_list.append(order.get("render", []))  # Include render for orders
+        
+        elif result_type in _PRODUCT_LIST_TYPES:
+            # Product lists
+            products = function_result.get("products", [])
+            for product in products[:5]:  # Limit to 5 for readability
+                price = product.get("formattedPrice", product.get("price", "N/A"))
+                orders_list.append(f"🛍️ {product.get('name', 'Unknown')} - {price}")
+                render_list.append(product.get("render", []))  # Include render for products
+        
+        # Structured fields are serialized once as compact JSON rather than
+        # repr'd wherever the prompt uses them
+        payload = {
+            "original_message": original_message,
+            "was_successful": was_successful,
+            "action_taken": action_taken,
+            "result_type": result_type,
+            "order_id": order_id,
+            "order_ids": self._to_prompt_json(order_ids),
+            "total_items": total_items,
+            "orders_list": self._to_prompt_json(orders_list),
+            "statistics": self._to_prompt_json(statistics),
+            "error": error,
+            "context": self._to_prompt_json(context),
+            "memory_content": memory_content
+        }
+        return payload, render_list
+    
+    async def _stream_natural_response(self, payload: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield response generator output as it is decoded"""
+        async for chunk in self.response_generator.astream(payload):
+            if chunk.content:
+                yield chunk.content
     
     async def _generate_natural_response(self, original_message: str, action_taken: str, function_result: Dict[str, Any], was_successful: bool, conversation_context: str) -> Dict[str, Any]:
         try:
-            result_type = function_result.get("type", "general")
-            
-            # Prepare data for response generation
-            order_id = function_result.get("order_id", "")
-            order_ids = function_result.get("order_ids", [])
-            total_items = function_result.get("totalItems", 0)
-            error = function_result.get("error", "")
-            memory_content = function_result.get("memory_content", "")
-            context = function_result.get("context", {})
-            statistics = function_result.get("statistics", {})
-            
-            # Format orders list for different result types
-            orders_list = []
-            render_list = []  # New: Store render instructions
-            
-            if result_type == "order_status":
-                # Single order items
-                items = function_result.get("items", [])
-                for item in items:
-                    options = item.get("options", {})
-                    size = options.get("Size", "N/A")
-                    orders_list.append(f"{item.get('name', 'Unknown')} (Size {size}) - {item.get('shipmentStatus', 'Unknown')}")
-                    render_list.append(item.get("render", []))  # Include render for items
-            
-            elif result_type == "multiple_order_status":
-                # Multiple order results
-                successful = function_result.get("successful", [])
-                failed = function_result.get("failed", [])
-                
-                for order in successful:
-                    orders_list.append(f"✅ {order.get('orderId', 'Unknown')} - {order.get('aggregatedStatus', 'Unknown')} - ${order.get('total', 'N/A')}")
-                    render_list.append(order.get("render", []))  # Include render for successful orders
-                
-                for order in failed:
-                    orders_list.append(f"❌ {order.get('orderId', 'Unknown')} - {order.get('error', 'Error')}")
-                    render_list.append([])  # No render for failed orders
-            
-            elif result_type in ["last_orders", "recent_orders", "orders_by_status"]:
-                # Order lists - FIXED: Use metric_value instead of orders
-                orders = function_result.get("metric_value", [])  # Changed from "orders" to "metric_value"
-                for order in orders:
-                    formatted_date = order.get("formattedDate", "Unknown date")
-                    status = order.get("aggregatedStatus", "Unknown")
-                    total = order.get("total", 0)
-                    orders_list.append(f"📦 {order.get('_id', 'Unknown')} - {formatted_date} - {status} - ${total}")
-                    render_list.append(order.get("render", []))  # Include render for orders
-            
-            elif result_type in ["new_arrivals", "mens_products", "womens_products", "search_results"]:
-                # Product lists
-                products = function_result.get("products", [])
-                for product in products[:5]:  # Limit to 5 for readability
-                    price = product.get("formattedPrice", product.get("price", "N/A"))
-                    orders_list.append(f"🛍️ {product.get('name', 'Unknown')} - {price}")
-                    render_list.append(product.get("render", []))  # Include render for products
+            payload, render_list = self._prepare_response_inputs(original_message, action_taken, function_result, was_successful)
             
             # Generate response using AI
-            response = await asyncio.to_thread(
-                self.response_generator.invoke,
-                {
-                    "original_message": original_message,
-                    "was_successful": was_successful,
-                    "action_taken": action_taken,
-                    "result_type": result_type,
-                    "order_id": order_id,
-                    "order_ids": order_ids,
-                    "total_items": total_items,
-                    "orders_list": orders_list,
-                    "statistics": statistics,
-                    "error": error,
-                    "context": context,
-                    "memory_content": memory_content
-                }
-            )
+            response = await self._ainvoke(self.response_generator, payload)
             
-            print(f"🔍 Generated render_list: {render_list}")  # Debug log to verify render_list
+            logger.debug("🔍 Generated render_list: %s", render_list)
             
             return {
                 "content": response.content,
@@ -743,7 +940,7 @@ Generate a response based on the information above.""")
             }
             
         except Exception as e:
-            print(f"❌ Error generating enhanced natural response: {str(e)}")
+            logger.error("❌ Error generating enhanced natural response: %s", e, exc_info=True)
             return {
                 "content": await self._create_fallback_response(
                     action=action_taken,
@@ -752,6 +949,11 @@ Generate a response based on the information above.""")
                 ),
                 "render": []
             }
+    @staticmethod
+    def _to_prompt_json(value: Any) -> str:
+        """Serialize structured result data compactly for prompt insertion"""
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    
     async def _create_fallback_response(self, action: str, result: Dict[str, Any], original_message: str) -> str:
         """Create fallback response when AI generation fails"""
         if not result.get("success", False):
@@ -789,7 +991,7 @@ Generate a response based on the information above.""")
             total_spent = stats.get("totalSpent", 0)
             return f"📊 You have {total_orders} total orders and spent ${total_spent:.2f}."
         
-        elif action in ["show_new_arrivals", "show_mens_products", "show_womens_products"]:
+        elif action in _CATALOG_ACTIONS:
             count = result.get("count", 0)
             category = result.get("category", "products")
             return f"Here are {count} {category} for you!"
@@ -798,15 +1000,8 @@ Generate a response based on the information above.""")
             return "I've processed your request! Is there anything else I can help you with?"
     
     async def _generate_contextual_help(self, topic: str) -> Dict[str, Any]:
-        """Generate help response based on topic (unchanged)"""
-        help_topics = {
-            "general help": "I'm here to assist with shopping, order tracking, or store policies! What do you need help with? You can ask about new arrivals, specific products, or check an order status.",
-            "returns": "Our return policy allows returns within 30 days of delivery. Items must be unworn and in original condition. Want to start a return or need more details?",
-            "shipping": "We offer standard and express shipping options. Standard shipping takes 5-7 business days. Need to check your order's shipping status or learn more?",
-            "payment": "We accept all major credit cards, PayPal, and Apple Pay. Having trouble with a payment or need help with something specific?"
-        }
-        
-        response = help_topics.get(topic.lower(), help_topics["general help"])
+        """Generate help response based on topic"""
+        response = self._HELP_TOPICS.get(topic.lower(), self._HELP_TOPICS["general help"])
         return {
             "success": True,
             "type": "help_response",
@@ -815,14 +1010,9 @@ Generate a response based on the information above.""")
     
     async def _handle_error_intelligently(self, message: str, error: str) -> Dict[str, Any]:
         """Handle errors with AI-generated responses (unchanged)"""
-        error_prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a customer service bot. An error occurred: {error}. Respond politely and helpfully, suggesting next steps."),
-            ("human", "Customer message: {message}")
-        ])
-        
         try:
-            response = await asyncio.to_thread(
-                error_prompt | self.llm,
+            response = await self._ainvoke(
+                self.error_handler,
                 {
                     "error": error,
                     "message": message
@@ -846,7 +1036,6 @@ Generate a response based on the information above.""")
     
     def is_healthy(self) -> bool:
         """Check if agent is healthy"""
-        try:
-            return bool(self.llm and self.intent_analyzer and self.response_generator)
-        except Exception:
-            return False
\ No newline at end of file
+        # All three are assigned in __init__ (which raises otherwise), so plain
+        # identity checks suffice and can't raise
+        return self.llm is not None and self.intent_analyzer is not None and self.response_generator is not None
\ No newline at end of file
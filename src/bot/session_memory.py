@@ -1,15 +1,39 @@
 # src/bot/session_memory.py - In-memory conversation storage for active sessions
 
-from typing import Dict, List, Any, Optional
+from typing import Deque, Dict, List, Any, Optional
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
+from itertools import islice
+from weakref import WeakValueDictionary
 import asyncio
+import logging
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+# Order IDs customers mention, e.g. order_ABC123 or cod_98765
+_ORDER_ID_PATTERN = re.compile(r'\b(order_\w+|cod_\w+)\b')
 
 class ConversationMessage:
     """Single message in conversation"""
+    __slots__ = ("content", "sender", "ts_epoch", "order_ids")
+    
     def __init__(self, content: str, sender: str, timestamp: datetime = None):
         self.content = content
         self.sender = sender  # 'user' or 'bot'
-        self.timestamp = timestamp or datetime.now()
+        # Stored as epoch seconds; the datetime/ISO form is only built when read
+        self.ts_epoch = timestamp.timestamp() if timestamp else time.time()
+        # Order IDs the customer mentioned, extracted once when the message is stored;
+        # every ID contains an underscore, so most messages skip the regex entirely
+        if sender == 'user' and '_' in content:
+            self.order_ids = tuple(_ORDER_ID_PATTERN.findall(content))
+        else:
+            self.order_ids = ()
+    
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.ts_epoch)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -22,38 +46,51 @@ class SessionMemory:
     """Manages conversation memory for active sessions"""
     
     def __init__(self, max_messages_per_session: int = 50, session_timeout_minutes: int = 60):
-        self.sessions: Dict[str, List[ConversationMessage]] = {}
-        self.session_last_activity: Dict[str, datetime] = {}
+        self.sessions: Dict[str, Deque[ConversationMessage]] = {}
+        # Monotonic last-activity time per session, kept in least-recently-active
+        # order so expired sessions can be evicted from the front
+        self.session_last_activity: "OrderedDict[str, float]" = OrderedDict()
+        # Per-session turn locks; entries disappear once no coroutine holds them
+        self._session_locks: "WeakValueDictionary[str, asyncio.Lock]" = WeakValueDictionary()
         self.max_messages = max_messages_per_session
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
         
         # Start cleanup task
         self._cleanup_task = asyncio.create_task(self._cleanup_expired_sessions())
-        print(f"✅ Session Memory initialized (max {max_messages_per_session} messages, {session_timeout_minutes}min timeout)")
+        logger.info("✅ Session Memory initialized (max %s messages, %smin timeout)", max_messages_per_session, session_timeout_minutes)
     
     def get_session_id(self, user_id: str) -> str:
         """Generate session ID from user ID"""
         return f"session_{user_id}"
     
+    def session_lock(self, user_id: str) -> asyncio.Lock:
+        """Get the lock that serializes conversation turns for one user"""
+        session_id = self.get_session_id(user_id)
+        lock = self._session_locks.get(session_id)
+        
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        
+        return lock
+    
     def add_message(self, user_id: str, content: str, sender: str) -> None:
         """Add message to user's session"""
         session_id = self.get_session_id(user_id)
         
-        # Initialize session if needed
+        # Initialize session if needed; the bounded deque drops the oldest
+        # messages on its own to prevent memory overflow
         if session_id not in self.sessions:
-            self.sessions[session_id] = []
-            print(f"🆕 New session created: {session_id}")
+            self.sessions[session_id] = deque(maxlen=self.max_messages)
+            logger.debug("🆕 New session created: %s", session_id)
         
         # Add message
         message = ConversationMessage(content, sender)
         self.sessions[session_id].append(message)
-        self.session_last_activity[session_id] = datetime.now()
+        self.session_last_activity[session_id] = time.monotonic()
+        self.session_last_activity.move_to_end(session_id)
         
-        # Keep only recent messages to prevent memory overflow
-        if len(self.sessions[session_id]) > self.max_messages:
-            self.sessions[session_id] = self.sessions[session_id][-self.max_messages:]
-        
-        print(f"💬 Added {sender} message to {session_id}: {content[:50]}...")
+        logger.debug("💬 Added %s message to %s: %.50s...", sender, session_id, content)
     
     def get_conversation_history(self, user_id: str, last_n_messages: int = None) -> List[Dict[str, Any]]:
         """Get conversation history for user"""
@@ -65,7 +102,8 @@ class SessionMemory:
         messages = self.sessions[session_id]
         
         if last_n_messages:
-            messages = messages[-last_n_messages:]
+            # Deques don't support negative slicing
+            messages = islice(messages, max(0, len(messages) - last_n_messages), None)
         
         return [msg.to_dict() for msg in messages]
     
@@ -97,19 +135,37 @@ class SessionMemory:
         
         return None
     
+    def get_mentioned_order_ids(self, user_id: str, last_n_messages: int = None) -> List[str]:
+        """Get distinct order IDs the user mentioned, in first-mentioned order"""
+        session_id = self.get_session_id(user_id)
+        messages = self.sessions.get(session_id)
+        
+        if not messages:
+            return []
+        
+        if last_n_messages:
+            messages = islice(messages, max(0, len(messages) - last_n_messages), None)
+        
+        return list(dict.fromkeys(
+            order_id for message in messages for order_id in message.order_ids
+        ))
+    
     def get_conversation_context(self, user_id: str, context_length: int = 6) -> str:
         """Get formatted conversation context for AI"""
-        history = self.get_conversation_history(user_id, context_length)
+        session_id = self.get_session_id(user_id)
+        messages = self.sessions.get(session_id)
         
-        if not history:
+        if not messages:
             return "This is the start of the conversation."
         
-        context_lines = []
-        for msg in history:
-            sender = "Customer" if msg["sender"] == "user" else "Assistant"
-            context_lines.append(f"{sender}: {msg['content']}")
+        start = max(0, len(messages) - context_length) if context_length else 0
+        recent = islice(messages, start, None)
+        context = "\n".join(
+            f"{'Customer' if msg.sender == 'user' else 'Assistant'}: {msg.content}"
+            for msg in recent
+        )
         
-        return "\n".join(context_lines)
+        return context
     
     def clear_session(self, user_id: str) -> bool:
         """Clear specific user session"""
@@ -119,7 +175,7 @@ class SessionMemory:
             del self.sessions[session_id]
             if session_id in self.session_last_activity:
                 del self.session_last_activity[session_id]
-            print(f"🧹 Cleared session: {session_id}")
+            logger.info("🧹 Cleared session: %s", session_id)
             return True
         
         return False
@@ -127,7 +183,7 @@ class SessionMemory:
     def get_session_stats(self) -> Dict[str, Any]:
         """Get memory usage statistics"""
         total_sessions = len(self.sessions)
-        total_messages = sum(len(msgs) for msgs in self.sessions.values())
+        total_messages = sum(map(len, self.sessions.values()))
         
         return {
             "total_sessions": total_sessions,
@@ -136,32 +192,37 @@ class SessionMemory:
             "avg_messages_per_session": total_messages / total_sessions if total_sessions > 0 else 0
         }
     
+    def _evict_expired_sessions(self) -> int:
+        """Drop sessions idle longer than the timeout, oldest first"""
+        cutoff = time.monotonic() - self.session_timeout.total_seconds()
+        expired = 0
+        
+        # Sessions are ordered by last activity, so stop at the first live one
+        while self.session_last_activity:
+            session_id, last_activity = next(iter(self.session_last_activity.items()))
+            if last_activity > cutoff:
+                break
+            
+            self.session_last_activity.popitem(last=False)
+            self.sessions.pop(session_id, None)
+            expired += 1
+        
+        return expired
+    
     async def _cleanup_expired_sessions(self):
         """Background task to clean up expired sessions"""
         while True:
             try:
-                current_time = datetime.now()
-                expired_sessions = []
-                
-                for session_id, last_activity in self.session_last_activity.items():
-                    if current_time - last_activity > self.session_timeout:
-                        expired_sessions.append(session_id)
-                
-                # Clean up expired sessions
-                for session_id in expired_sessions:
-                    if session_id in self.sessions:
-                        del self.sessions[session_id]
-                    if session_id in self.session_last_activity:
-                        del self.session_last_activity[session_id]
+                expired = self._evict_expired_sessions()
                 
-                if expired_sessions:
-                    print(f"🧹 Cleaned up {len(expired_sessions)} expired sessions")
+                if expired:
+                    logger.info("🧹 Cleaned up %s expired sessions", expired)
                 
                 # Wait 5 minutes before next cleanup
                 await asyncio.sleep(300)
                 
             except Exception as e:
-                print(f"❌ Error in session cleanup: {e}")
+                logger.error("❌ Error in session cleanup: %s", e)
                 await asyncio.sleep(60)  # Wait 1 minute on error
     
     def __del__(self):